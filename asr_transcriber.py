@@ -1,16 +1,35 @@
 import os
 import tempfile
-import torch
+import contextlib
 import re
-from funasr import AutoModel
+import threading
+import numpy as np
 from typing import Optional, Dict, Any, List
 
+# 预编译文本清理用的正则表达式
+_TAG_RE = re.compile(r'<\|[^|]*\|>')
+_WS_RE = re.compile(r'\s+')
+
+# 触发segment结束的标点符号
+_SENT_END = frozenset({'。', '！', '？', '.', '!', '?', ',', '，'})
+
+# VAD单个片段最大时长(毫秒)，也是预热编译模型时使用的输入长度
+_VAD_MAX_SEGMENT_MS = 15000
+
+# 字幕片段数不少于该值时使用NumPy批量格式化时间
+_VECTORIZE_MIN_CUES = 32
+
 class ASRTranscriber:
     """
     基于FunASR的语音转文字转录器
     """
     
-    def __init__(self, model_name="iic/SenseVoiceSmall", vad_model="fsmn-vad", device="auto", enable_vad=True):
+    # 已加载模型的进程级缓存，键为(model_name, vad_model, device, compile_model)
+    _MODEL_CACHE: Dict[tuple, Any] = {}
+    _MODEL_CACHE_LOCK = threading.Lock()
+    
+    def __init__(self, model_name="iic/SenseVoiceSmall", vad_model="fsmn-vad", device="auto", enable_vad=True,
+                 compile_model=False, precision="auto", verbose=False):
         """
         初始化ASR转录器
         
@@ -19,10 +38,16 @@ class ASRTranscriber:
             vad_model (str): VAD(语音活动检测)模型名称
             device (str): 设备类型 ("cpu", "cuda", "mps", "auto")
             enable_vad (bool): 是否启用VAD (默认: True)
+            compile_model (bool): 是否在CUDA上使用torch.compile编译模型 (默认: False)
+            precision (str): 推理精度 ("auto", "fp32", "fp16", "bf16")，auto在CUDA上使用半精度
+            verbose (bool): 是否输出调试信息 (默认: False)
         """
         self.model_name = model_name
         self.vad_model = vad_model if enable_vad else None
         self.enable_vad = enable_vad
+        self.compile_model = compile_model
+        self.precision = precision
+        self.verbose = verbose
         self.device = self._get_optimal_device(device)
         self.model = None
         self._load_model()
@@ -37,6 +62,8 @@ class ASRTranscriber:
         Returns:
             str: 最优设备名称
         """
+        import torch
+        
         if device != "auto":
             return device
         
@@ -55,6 +82,26 @@ class ASRTranscriber:
         """
         加载ASR模型
         """
+        key = (self.model_name, self.vad_model, self.device, self.compile_model)
+        with self._MODEL_CACHE_LOCK:
+            cached_model = self._MODEL_CACHE.get(key)
+            if cached_model is not None:
+                if self.verbose:
+                    print(f"复用已加载的模型: {self.model_name}")
+                self.model = cached_model
+                return
+            
+            self._build_model()
+            self._MODEL_CACHE[key] = self.model
+    
+    def _build_model(self):
+        """
+        构建FunASR模型实例
+        """
+        from funasr import AutoModel
+        
+        self._configure_backend()
+        
         try:
             print(f"正在加载模型: {self.model_name}...")
             if self.enable_vad:
@@ -62,7 +109,7 @@ class ASRTranscriber:
                 self.model = AutoModel(
                     model=self.model_name,
                     vad_model=self.vad_model,
-                    vad_kwargs={"max_single_segment_time": 15000},  # VAD配置，15秒分段
+                    vad_kwargs={"max_single_segment_time": _VAD_MAX_SEGMENT_MS},  # VAD配置，15秒分段
                     device=self.device
                 )
             else:
@@ -74,6 +121,133 @@ class ASRTranscriber:
             print("模型加载成功！")
         except Exception as e:
             raise Exception(f"模型加载失败: {str(e)}")
+        
+        if self.compile_model:
+            self._compile_model()
+    
+    @classmethod
+    def clear_cache(cls):
+        """
+        清空已加载模型的缓存，释放模型占用的内存
+        """
+        with cls._MODEL_CACHE_LOCK:
+            cls._MODEL_CACHE.clear()
+    
+    def _configure_backend(self):
+        """
+        配置CUDA后端：启用cuDNN自动调优和TF32矩阵乘法
+        """
+        if self.device != "cuda":
+            return
+        
+        import torch
+        
+        torch.backends.cudnn.benchmark = True
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
+        torch.set_float32_matmul_precision("high")
+    
+    def _compile_model(self):
+        """
+        使用torch.compile编译ASR编码器并预热，避免首次转录承担编译开销
+        
+        AutoModel.inference调用的是内部模型的inference方法而不是forward，编译整个模型不会生效；
+        编码器在inference中以模块方式调用，因此只编译编码器。
+        
+        mode="reduce-overhead"只为预热时的15秒单片段形状捕获CUDA Graph。VAD片段长度不固定，FunASR
+        又按批内最长片段补齐，实际推理中的(B, T)形状几乎每批都不同；这些形状走动态形状编译的内核，
+        不再逐个记录CUDA Graph，避免每批都承担记录开销。
+        """
+        import torch
+        import torch._inductor.config
+        from torch._dynamo.utils import counters
+        
+        if self.device != "cuda" or not hasattr(torch, "compile"):
+            print("⚠️  torch.compile仅在CUDA设备和PyTorch 2.0+上启用，继续使用eager模式")
+            return
+        
+        inner_model = getattr(self.model, "model", None)
+        encoder = getattr(inner_model, "encoder", None)
+        if not isinstance(encoder, torch.nn.Module):
+            print("⚠️  未找到可编译的编码器，继续使用eager模式")
+            return
+        
+        try:
+            print("正在编译模型（torch.compile）...")
+            # 动态形状的图不捕获CUDA Graph，只有预热时的静态形状会重放
+            torch._inductor.config.triton.cudagraph_skip_dynamic_graphs = True
+            graphs_before = counters["stats"]["unique_graphs"]
+            inner_model.encoder = torch.compile(encoder, mode="reduce-overhead", fullgraph=False)
+            
+            # 预热：直接调用ASR模型（绕过VAD，静音不会被VAD送入编码器）
+            with torch.inference_mode(), self._autocast_context():
+                # 15秒片段运行两次：第一次编译静态图并记录CUDA Graph，第二次重放
+                skips_before = counters["inductor"]["cudagraph_skips"]
+                for _ in range(2):
+                    self.model.inference(np.zeros(16 * _VAD_MAX_SEGMENT_MS, dtype=np.float32), fs=16000)
+                graph_skipped = counters["inductor"]["cudagraph_skips"] > skips_before
+                # 不同长度触发动态形状编译，使首个真实请求不再承担重新编译的开销
+                self.model.inference(np.zeros(16000, dtype=np.float32), fs=16000)
+            
+            if counters["stats"]["unique_graphs"] == graphs_before:
+                raise Exception("预热时编码器未经过编译路径")
+            if graph_skipped:
+                # 编码器中存在无法捕获的操作时，编译后的内核仍然有效，只是不使用CUDA Graph
+                print("⚠️  编码器无法捕获CUDA Graph，将使用编译后的内核逐个启动")
+            print("模型编译完成！")
+        except Exception as e:
+            # 编译失败时回退到eager模式
+            inner_model.encoder = encoder
+            print(f"⚠️  模型编译失败，继续使用eager模式: {str(e)}")
+    
+    def _autocast_context(self):
+        """
+        根据设备和精度设置返回推理用的autocast上下文
+        
+        Returns:
+            上下文管理器: torch.autocast或空上下文
+        """
+        import torch
+        
+        if self.device == "cuda" and self.precision in ("auto", "fp16", "bf16"):
+            if self.precision == "fp16":
+                dtype = torch.float16
+            elif self.precision == "bf16" or torch.cuda.is_bf16_supported():
+                dtype = torch.bfloat16
+            else:
+                dtype = torch.float16
+            return torch.autocast(device_type="cuda", dtype=dtype)
+        
+        # CPU上仅在显式指定bf16时启用（需要支持AVX-512 BF16的CPU才有收益）
+        if self.device == "cpu" and self.precision == "bf16":
+            return torch.autocast(device_type="cpu", dtype=torch.bfloat16)
+        
+        return contextlib.nullcontext()
+    
+    def _get_batch_size_s(self, batch_size: int) -> int:
+        """
+        根据设备和可用显存计算动态批处理秒数
+        
+        Args:
+            batch_size (int): 用户指定的批处理大小(秒)
+            
+        Returns:
+            int: 实际使用的batch_size_s
+        """
+        if self.device == "cpu":
+            return min(batch_size, 60)
+        if self.device == "mps":
+            return min(batch_size, 300)
+        if self.device == "cuda":
+            try:
+                import torch
+                # 每GB空闲显存约60秒音频，最大6000秒
+                free_bytes, _ = torch.cuda.mem_get_info()
+                limit = max(60, min(int(free_bytes / 1e9 * 60), 6000))
+            except Exception:
+                limit = 6000
+            return min(batch_size, limit)
+        return min(batch_size, 6000)  # 最大6000秒批处理
     
     def transcribe_audio(self, audio_path: str, language: str = "auto", max_length: int = 1800, batch_size: int = 8) -> Dict[str, Any]:
         """
@@ -94,78 +268,210 @@ class ASRTranscriber:
         if self.model is None:
             raise Exception("模型未正确加载")
         
-        # 获取音频信息用于优化参数
-        audio_info = self._get_audio_info(audio_path)
-        print(f"音频时长: {audio_info['duration']:.1f}秒，使用FunASR智能分段处理")
-        
         try:
-            print(f"正在转录音频文件: {audio_path}")
-            
-            # 使用传入的batch_size作为batch_size_s（动态批处理秒数）
-            # 如果batch_size较小，扩大到合理值以提高效率
-            batch_size_s = min(batch_size, 6000)  # 最大6000秒批处理
-            # 设置合理的合并长度，避免片段过短
-            merge_length_s = min(max_length, 30)
-            
-            print(f"使用参数: batch_size_s={batch_size_s}, merge_length_s={merge_length_s}")
-            
-            # 执行转录，使用FunASR内置智能分段
-            result = self.model.generate(
-                input=audio_path,
-                language=language if language != "auto" else None,
-                batch_size_s=batch_size_s,    # 动态批处理大小(秒)
-                hotword=None,                 # 热词增强
-                use_itn=True,                # 使用逆文本规范化
-                output_timestamp=True,        # 启用时间戳输出
-                merge_vad=False,             # 默认不启用VAD合并
-                # merge_length_s=merge_length_s, # VAD片段合并长度
-                return_raw_text=True         # 返回原始文本
-            )
+            if self.verbose:
+                print(f"正在转录音频文件: {audio_path}")
+            # soundfile无法解码的格式（如AAC）返回原路径，由FunASR自行解码
+            audio_input = self._load_pcm(audio_path)
+            if self.verbose and isinstance(audio_input, np.ndarray):
+                print(f"音频时长: {len(audio_input) / 16000:.1f}秒，使用FunASR智能分段处理")
+            result = self._generate(audio_input, language, max_length, batch_size)
             
             # 处理结果
             if isinstance(result, list) and len(result) > 0:
-                transcription_result = result[0]
-                
-                # 调试：检查是否成功获取时间戳
-                if self.device != "cpu":  # 只在非CPU模式下显示详细信息
-                    timestamps = transcription_result.get("timestamp", [])
-                    words = transcription_result.get("words", [])
-                    print(f"获取到 {len(timestamps)} 个时间戳，{len(words)} 个词汇")
-                
-                # 清理文本中的标记符号
-                raw_text = transcription_result.get("text", "")
-                cleaned_text = self._clean_text(raw_text)
-                
-                # 处理时间戳和分词信息
-                timestamps = transcription_result.get("timestamp", [])
-                words = transcription_result.get("words", [])
-                
-                # 生成带时间戳的segments
-                cleaned_segments = self._create_segments_from_timestamps(cleaned_text, timestamps, words)
-                
-                return {
-                    "success": True,
-                    "text": cleaned_text,
-                    "segments": cleaned_segments,
-                    "language": transcription_result.get("language", "unknown"),
-                    "duration": transcription_result.get("duration", 0),
-                    "confidence": transcription_result.get("confidence", 0)
-                }
+                return self._parse_transcription_result(result[0])
             else:
-                return {
-                    "success": False,
-                    "error": "未获取到转录结果",
-                    "text": "",
-                    "segments": []
-                }
+                return self._failed_result("未获取到转录结果")
                 
         except Exception as e:
-            return {
-                "success": False,
-                "error": f"转录失败: {str(e)}",
-                "text": "",
-                "segments": []
-            }
+            return self._failed_result(f"转录失败: {str(e)}")
+    
+    def transcribe_many(self, audio_paths: List[str], language: str = "auto", max_length: int = 1800, batch_size: int = 8,
+                        with_timestamps: bool = False) -> List[Dict[str, Any]]:
+        """
+        批量转录多个音频文件，模型只加载一次；禁用VAD时在一次generate调用中批量推理
+        
+        Args:
+            audio_paths (List[str]): 音频文件路径列表
+            language (str): 语言代码
+            max_length (int): VAD分段最大长度(秒)
+            batch_size (int): 批处理大小
+            with_timestamps (bool): 是否附加formatted_segments（同transcribe_with_timestamps）
+        
+        Returns:
+            List[Dict[str, Any]]: 与audio_paths一一对应的转录结果
+        """
+        if self.model is None:
+            raise Exception("模型未正确加载")
+        
+        # 不存在的文件单独标记失败，其余文件照常批量转录
+        results: List[Optional[Dict[str, Any]]] = [None] * len(audio_paths)
+        pending = []
+        for i, audio_path in enumerate(audio_paths):
+            if os.path.exists(audio_path):
+                pending.append(i)
+            else:
+                results[i] = self._failed_result(f"音频文件不存在: {audio_path}")
+        
+        if pending:
+            if self.verbose:
+                print(f"共 {len(pending)} 个音频文件，使用FunASR智能分段处理")
+            if self.enable_vad:
+                # 启用VAD时FunASR本就逐个处理输入，合并调用不共享推理；逐个转录使出错只影响对应文件
+                for i in pending:
+                    results[i] = self._transcribe_batch([audio_paths[i]], language, max_length, batch_size)[0]
+            else:
+                batch_results = self._transcribe_batch([audio_paths[i] for i in pending], language, max_length, batch_size)
+                for i, result in zip(pending, batch_results):
+                    results[i] = result
+        
+        if with_timestamps:
+            for result in results:
+                self._add_formatted_segments(result)
+        
+        return results
+    
+    def _transcribe_batch(self, audio_paths: List[str], language: str, max_length: int, batch_size: int) -> List[Dict[str, Any]]:
+        """
+        在一次generate调用中转录多个已存在的音频文件；整批失败时逐个重试，使错误只影响出错的文件
+        
+        Args:
+            audio_paths (List[str]): 音频文件路径列表
+            language (str): 语言代码
+            max_length (int): VAD分段最大长度(秒)
+            batch_size (int): 批处理大小
+        
+        Returns:
+            List[Dict[str, Any]]: 与audio_paths一一对应的转录结果
+        """
+        try:
+            # 单个文件预先解码为PCM；多个文件传路径，由FunASR逐个读取，避免所有音频同时驻留内存
+            if len(audio_paths) == 1:
+                audio_inputs = [self._load_pcm(audio_paths[0])]
+            else:
+                audio_inputs = list(audio_paths)
+            result = self._generate(audio_inputs, language, max_length, batch_size)
+            if not isinstance(result, list) or len(result) != len(audio_paths):
+                raise Exception("未获取到转录结果")
+        except Exception as e:
+            if len(audio_paths) > 1:
+                # 单个文件无法解码会导致整批失败，逐个重试以定位出错的文件
+                return [self._transcribe_batch([path], language, max_length, batch_size)[0] for path in audio_paths]
+            return [self._failed_result(f"转录失败: {str(e)}")]
+        
+        results = []
+        for transcription_result in result:
+            try:
+                results.append(self._parse_transcription_result(transcription_result))
+            except Exception as e:
+                results.append(self._failed_result(f"转录失败: {str(e)}"))
+        
+        return results
+    
+    def _generate(self, audio_input: Any, language: str, max_length: int, batch_size: int) -> Any:
+        """
+        调用FunASR执行转录
+        
+        Args:
+            audio_input (Any): 16kHz单声道PCM数组、音频文件路径或它们的列表
+            language (str): 语言代码
+            max_length (int): VAD分段最大长度(秒)
+            batch_size (int): 批处理大小
+        
+        Returns:
+            Any: model.generate的原始返回结果
+        """
+        import torch
+        
+        # 使用传入的batch_size作为batch_size_s（动态批处理秒数），按设备能力限制上限
+        batch_size_s = self._get_batch_size_s(batch_size)
+        # 设置合理的合并长度，避免片段过短
+        merge_length_s = min(max_length, 30)
+        
+        if self.verbose:
+            print(f"使用参数: batch_size_s={batch_size_s}, merge_length_s={merge_length_s}")
+        
+        # 执行转录，使用FunASR内置智能分段
+        try:
+            with torch.inference_mode(), self._autocast_context():
+                return self.model.generate(
+                    input=audio_input,
+                    fs=16000,                     # 数组输入的采样率
+                    language=language if language != "auto" else None,
+                    batch_size_s=batch_size_s,    # 动态批处理大小(秒)
+                    hotword=None,                 # 热词增强
+                    use_itn=True,                # 使用逆文本规范化
+                    output_timestamp=True,        # 启用时间戳输出
+                    merge_vad=False,             # 默认不启用VAD合并
+                    # merge_length_s=merge_length_s, # VAD片段合并长度
+                    return_raw_text=True         # 返回原始文本
+                )
+        finally:
+            self._release_cuda_cache()
+    
+    def _release_cuda_cache(self):
+        """
+        显存紧张时释放CUDA缓存分配器中的空闲块，避免多文件转录时因碎片导致OOM
+        
+        可通过环境变量 ASR_EMPTY_CACHE=0 关闭
+        """
+        if self.device != "cuda" or os.environ.get("ASR_EMPTY_CACHE", "1") != "1":
+            return
+        
+        import torch
+        
+        try:
+            free_bytes, total_bytes = torch.cuda.mem_get_info()
+            # 空闲显存低于20%时才释放
+            if free_bytes / total_bytes < 0.2:
+                torch.cuda.empty_cache()
+        except Exception:
+            torch.cuda.empty_cache()
+    
+    def _parse_transcription_result(self, transcription_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        将单个FunASR结果转换为转录结果字典
+        
+        Args:
+            transcription_result (Dict[str, Any]): model.generate返回列表中的一项
+        
+        Returns:
+            Dict[str, Any]: 转录结果
+        """
+        # 调试：检查是否成功获取时间戳
+        if self.verbose:
+            timestamps = transcription_result.get("timestamp", [])
+            words = transcription_result.get("words", [])
+            print(f"获取到 {len(timestamps)} 个时间戳，{len(words)} 个词汇")
+        
+        # 清理文本中的标记符号
+        raw_text = transcription_result.get("text", "")
+        cleaned_text = self._clean_text(raw_text)
+        
+        # 处理时间戳和分词信息
+        timestamps = transcription_result.get("timestamp", [])
+        words = transcription_result.get("words", [])
+        
+        # 生成带时间戳的segments
+        cleaned_segments = self._create_segments_from_timestamps(cleaned_text, timestamps, words)
+        
+        return {
+            "success": True,
+            "text": cleaned_text,
+            "segments": cleaned_segments,
+            "language": transcription_result.get("language", "unknown"),
+            "duration": transcription_result.get("duration", 0),
+            "confidence": transcription_result.get("confidence", 0)
+        }
+    
+    def _failed_result(self, error: str) -> Dict[str, Any]:
+        """构建转录失败的结果"""
+        return {
+            "success": False,
+            "error": error,
+            "text": "",
+            "segments": []
+        }
     
     def transcribe_with_timestamps(self, audio_path: str, language: str = "auto", max_length: int = 1800, batch_size: int = 8) -> Dict[str, Any]:
         """
@@ -181,7 +487,18 @@ class ASRTranscriber:
             Dict[str, Any]: 带时间戳的转录结果
         """
         result = self.transcribe_audio(audio_path, language, max_length, batch_size)
+        return self._add_formatted_segments(result)
+    
+    def _add_formatted_segments(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        为转录结果添加带序号的formatted_segments
         
+        Args:
+            result (Dict[str, Any]): 转录结果
+        
+        Returns:
+            Dict[str, Any]: 添加了formatted_segments的转录结果
+        """
         if result["success"] and result["segments"]:
             formatted_segments = []
             for i, segment in enumerate(result["segments"]):
@@ -220,17 +537,12 @@ class ASRTranscriber:
         if not text:
             return ""
         
-        # 移除各种标记符号
-        # 匹配模式：<|...| >
-        cleaned_text = re.sub(r'<\|[^|]*\|>', '', text)
-        
-        # 移除多余的空格
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
+        # 移除标记符号（<|...|>），不含标记时跳过正则扫描
+        if '<|' in text:
+            text = _TAG_RE.sub('', text)
         
-        # 移除首尾空格
-        cleaned_text = cleaned_text.strip()
-        
-        return cleaned_text
+        # 合并多余空格并去除首尾空格
+        return _WS_RE.sub(' ', text).strip()
     
     def _clean_segments(self, segments: List[Any]) -> List[Any]:
         """
@@ -307,27 +619,29 @@ class ASRTranscriber:
         # 按句子分组时间戳
         segments = []
         current_segment = {
-            "text": "",
+            "text_parts": [],
             "start": None,
             "end": None,
             "words": []
         }
         
-        for i, (word, timestamp) in enumerate(zip(words, timestamps)):
+        # 一次性将毫秒时间戳转换为秒，转回Python float以保持输出类型不变
+        timestamps_sec = (np.asarray(timestamps, dtype=np.float64) / 1000.0).tolist()
+        last_index = len(words) - 1
+        
+        for i, word in enumerate(words):
             # 跳过标记符号
             if word.startswith('<|') and word.endswith('|>'):
                 continue
                 
-            start_ms, end_ms = timestamp
-            start_sec = start_ms / 1000.0
-            end_sec = end_ms / 1000.0
+            start_sec, end_sec = timestamps_sec[i]
             
             # 设置segment开始时间
             if current_segment["start"] is None:
                 current_segment["start"] = start_sec
             
             # 添加词汇到当前segment
-            current_segment["text"] += word
+            current_segment["text_parts"].append(word)
             current_segment["end"] = end_sec
             current_segment["words"].append({
                 "word": word,
@@ -335,11 +649,12 @@ class ASRTranscriber:
                 "end": end_sec
             })
             
-            # 判断是否应该结束当前segment（遇到句号、问号、感叹号）
-            if word in ['。', '！', '？', '.', '!', '?',',','，'] or i == len(words) - 1:
-                if current_segment["text"].strip():
+            # 判断是否应该结束当前segment（词以句号、问号、感叹号、逗号结尾）
+            if (word and word[-1] in _SENT_END) or i == last_index:
+                segment_text = ''.join(current_segment["text_parts"])
+                if segment_text.strip():
                     segments.append({
-                        "text": current_segment["text"],
+                        "text": segment_text,
                         "start": current_segment["start"],
                         "end": current_segment["end"],
                         "words": current_segment["words"]
@@ -347,7 +662,7 @@ class ASRTranscriber:
                 
                 # 重置当前segment
                 current_segment = {
-                    "text": "",
+                    "text_parts": [],
                     "start": None,
                     "end": None,
                     "words": []
@@ -396,18 +711,13 @@ class ASRTranscriber:
     
     def _format_as_srt(self, result: Dict[str, Any]) -> str:
         """格式化为SRT字幕格式"""
-        srt_content = ""
+        cues = []  # (序号, 开始秒数, 结束秒数, 文本)
         
         # 优先使用formatted_segments（带时间戳）
         if "formatted_segments" in result and result["formatted_segments"]:
             segments = result["formatted_segments"]
             for segment in segments:
-                start_time = self._seconds_to_srt_time(segment["start_time"])
-                end_time = self._seconds_to_srt_time(segment["end_time"])
-                
-                srt_content += f"{segment['index']}\n"
-                srt_content += f"{start_time} --> {end_time}\n"
-                srt_content += f"{segment['text']}\n\n"
+                cues.append((segment['index'], segment["start_time"], segment["end_time"], segment['text']))
         
         # 使用真实时间戳的segments
         elif "segments" in result and result["segments"]:
@@ -416,13 +726,7 @@ class ASRTranscriber:
             for i, segment in enumerate(segments):
                 if isinstance(segment, dict) and "start" in segment and "end" in segment:
                     # 使用FunASR返回的真实时间戳
-                    start_time = self._seconds_to_srt_time(segment["start"])
-                    end_time = self._seconds_to_srt_time(segment["end"])
-                    text = segment.get("text", "")
-                    
-                    srt_content += f"{i + 1}\n"
-                    srt_content += f"{start_time} --> {end_time}\n"
-                    srt_content += f"{text}\n\n"
+                    cues.append((i + 1, segment["start"], segment["end"], segment.get("text", "")))
         
         # 最后兜底：使用全文本，智能分句
         else:
@@ -436,33 +740,31 @@ class ASRTranscriber:
                 for i, sentence in enumerate(sentences):
                     # 根据句子长度动态计算时间
                     duration = max(2.0, len(sentence) * 0.4)  # 最少2秒
-                    start_time = self._seconds_to_srt_time(current_time)
-                    end_time = self._seconds_to_srt_time(current_time + duration)
+                    start = current_time
                     current_time += duration
                     
                     # 恢复标点符号
                     if not sentence.endswith(('。', '！', '？', '.', '!', '?')):
                         sentence += '。'
                     
-                    srt_content += f"{i + 1}\n"
-                    srt_content += f"{start_time} --> {end_time}\n"
-                    srt_content += f"{sentence}\n\n"
-        
-        return srt_content
+                    cues.append((i + 1, start, current_time, sentence))
+        
+        start_times = self._format_times([cue[1] for cue in cues], ",")
+        end_times = self._format_times([cue[2] for cue in cues], ",")
+        return ''.join([
+            f"{index}\n{start_time} --> {end_time}\n{text}\n\n"
+            for (index, _, _, text), start_time, end_time in zip(cues, start_times, end_times)
+        ])
     
     def _format_as_vtt(self, result: Dict[str, Any]) -> str:
         """格式化为VTT字幕格式"""
-        vtt_content = "WEBVTT\n\n"
+        cues = []  # (开始秒数, 结束秒数, 文本)
         
         # 优先使用formatted_segments（带时间戳）
         if "formatted_segments" in result and result["formatted_segments"]:
             segments = result["formatted_segments"]
             for segment in segments:
-                start_time = self._seconds_to_vtt_time(segment["start_time"])
-                end_time = self._seconds_to_vtt_time(segment["end_time"])
-                
-                vtt_content += f"{start_time} --> {end_time}\n"
-                vtt_content += f"{segment['text']}\n\n"
+                cues.append((segment["start_time"], segment["end_time"], segment['text']))
         
         # 使用原始segments中的真实时间戳
         elif "segments" in result and result["segments"]:
@@ -471,25 +773,21 @@ class ASRTranscriber:
                 if isinstance(segment, dict):
                     # 如果有真实的时间戳，使用它们
                     if "start" in segment and "end" in segment:
-                        start_time = self._seconds_to_vtt_time(segment["start"])
-                        end_time = self._seconds_to_vtt_time(segment["end"])
+                        start, end = segment["start"], segment["end"]
                     else:
                         # 否则根据段落长度估算更合理的时间
                         text = segment.get("text", "")
                         duration = max(2.0, len(text) * 0.4)
-                        start_time = self._seconds_to_vtt_time(i * duration)
-                        end_time = self._seconds_to_vtt_time((i + 1) * duration)
+                        start, end = i * duration, (i + 1) * duration
                     
                     text = segment.get("text", str(segment))
                 else:
                     # 字符串类型的segment
                     text = str(segment)
                     duration = max(2.0, len(text) * 0.4)
-                    start_time = self._seconds_to_vtt_time(i * duration)
-                    end_time = self._seconds_to_vtt_time((i + 1) * duration)
+                    start, end = i * duration, (i + 1) * duration
                 
-                vtt_content += f"{start_time} --> {end_time}\n"
-                vtt_content += f"{text}\n\n"
+                cues.append((start, end, text))
         
         # 最后兜底：使用全文本，智能分句
         else:
@@ -503,54 +801,79 @@ class ASRTranscriber:
                 for i, sentence in enumerate(sentences):
                     # 根据句子长度动态计算时间
                     duration = max(2.0, len(sentence) * 0.4)
-                    start_time = self._seconds_to_vtt_time(current_time)
-                    end_time = self._seconds_to_vtt_time(current_time + duration)
+                    start = current_time
                     current_time += duration
                     
                     # 恢复标点符号
                     if not sentence.endswith(('。', '！', '？', '.', '!', '?')):
                         sentence += '。'
                     
-                    vtt_content += f"{start_time} --> {end_time}\n"
-                    vtt_content += f"{sentence}\n\n"
-        
-        return vtt_content
+                    cues.append((start, current_time, sentence))
+        
+        start_times = self._format_times([cue[0] for cue in cues], ".")
+        end_times = self._format_times([cue[1] for cue in cues], ".")
+        return "WEBVTT\n\n" + ''.join([
+            f"{start_time} --> {end_time}\n{text}\n\n"
+            for (_, _, text), start_time, end_time in zip(cues, start_times, end_times)
+        ])
     
-    def _seconds_to_srt_time(self, seconds: float) -> str:
-        """将秒数转换为SRT时间格式"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millisecs = int((seconds - int(seconds)) * 1000)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{millisecs:03d}"
+    def _format_times(self, seconds_list: List[float], ms_separator: str) -> List[str]:
+        """
+        批量将秒数转换为字幕时间格式，片段较多时使用NumPy向量化计算
+        
+        Args:
+            seconds_list (List[float]): 秒数列表
+            ms_separator (str): 秒与毫秒之间的分隔符（SRT为","，VTT为"."）
+            
+        Returns:
+            List[str]: 格式化后的时间字符串列表
+        """
+        if len(seconds_list) < _VECTORIZE_MIN_CUES:
+            parts = [self._split_seconds(seconds) for seconds in seconds_list]
+        else:
+            # np.rint与round一致，均为四舍六入五成双
+            millisecs = np.rint(np.asarray(seconds_list, dtype=np.float64) * 1000).astype(np.int64)
+            hours, millisecs = np.divmod(millisecs, 3600_000)
+            minutes, millisecs = np.divmod(millisecs, 60_000)
+            secs, millisecs = np.divmod(millisecs, 1000)
+            parts = zip(hours.tolist(), minutes.tolist(), secs.tolist(), millisecs.tolist())
+        
+        return [
+            f"{hours:02d}:{minutes:02d}:{secs:02d}{ms_separator}{millisecs:03d}"
+            for hours, minutes, secs, millisecs in parts
+        ]
     
-    def _seconds_to_vtt_time(self, seconds: float) -> str:
-        """将秒数转换为VTT时间格式"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = seconds % 60
-        return f"{hours:02d}:{minutes:02d}:{secs:06.3f}"
+    def _split_seconds(self, seconds: float) -> tuple:
+        """将秒数按整数毫秒拆分为(时, 分, 秒, 毫秒)"""
+        millisecs = int(round(seconds * 1000))
+        hours, millisecs = divmod(millisecs, 3600_000)
+        minutes, millisecs = divmod(millisecs, 60_000)
+        secs, millisecs = divmod(millisecs, 1000)
+        return hours, minutes, secs, millisecs
     
-    def _get_audio_info(self, audio_path: str) -> Dict[str, Any]:
+    def _load_pcm(self, audio_path: str) -> Any:
         """
-        获取音频文件信息
+        读取音频并一次性转换为16kHz单声道float32数组，避免FunASR内部重复解码和重采样
         
         Args:
             audio_path (str): 音频文件路径
             
         Returns:
-            Dict[str, Any]: 音频信息
+            Any: np.float32数组；soundfile无法解码时返回原路径，交由FunASR处理
         """
+        import soundfile as sf
+        
         try:
-            import soundfile as sf
-            data, samplerate = sf.read(audio_path)
-            duration = len(data) / samplerate
-            return {
-                "duration": duration,
-                "sample_rate": samplerate,
-                "channels": data.shape[1] if len(data.shape) > 1 else 1,
-                "samples": len(data)
-            }
-        except Exception as e:
-            raise Exception(f"无法读取音频文件信息: {str(e)}")
-    
+            data, samplerate = sf.read(audio_path, dtype="float32")
+        except Exception:
+            return audio_path
+        
+        # 多声道混合为单声道
+        if data.ndim > 1:
+            data = data.mean(axis=1)
+        
+        if samplerate != 16000:
+            from scipy.signal import resample_poly
+            data = resample_poly(data, 16000, samplerate)
+        
+        return np.ascontiguousarray(data, dtype=np.float32)
@@ -7,7 +7,9 @@
 import os
 import sys
 import argparse
+import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from video_processor import (
@@ -43,12 +45,14 @@ def setup_argparse():
   python main.py input.mp4 -f srt -l zh              # 输出SRT字幕，指定中文
   python main.py input.mp4 -f json --timestamps      # 输出JSON格式，包含时间戳
   python main.py input.mp4 --model paraformer-zh     # 使用指定模型
+  python main.py a.mp4 b.mp4 c.mp4 -f srt            # 批量转录多个文件，模型只加载一次
         """
     )
     
     parser.add_argument(
         "input",
-        help="输入视频文件路径"
+        nargs="+",
+        help="输入视频文件路径，可指定多个文件批量转录"
     )
     
     parser.add_argument(
@@ -120,6 +124,19 @@ def setup_argparse():
         help="批处理大小，GPU加速时可适当增大 (默认: 600)"
     )
     
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="使用torch.compile编译模型，仅CUDA有效，首次加载较慢 (默认: 关闭)"
+    )
+    
+    parser.add_argument(
+        "--precision",
+        choices=["auto", "fp32", "fp16", "bf16"],
+        default="auto",
+        help="推理精度 (默认: auto，CUDA上自动使用BF16/FP16)"
+    )
+    
     parser.add_argument(
         "--vad-off",
         action="store_true",
@@ -128,20 +145,60 @@ def setup_argparse():
     
     return parser
 
-def generate_output_path(input_path, output_format):
-    """生成输出文件路径"""
+def generate_output_path(input_path, output_format="text", ext=None):
+    """生成输出文件路径，ext可直接指定扩展名（如".wav"），否则根据输出格式确定"""
     input_path = Path(input_path)
-    base_name = input_path.stem
     
-    format_extensions = {
-        "text": ".txt",
-        "srt": ".srt",
-        "vtt": ".vtt",
-        "json": ".json"
-    }
+    if ext is None:
+        format_extensions = {
+            "text": ".txt",
+            "srt": ".srt",
+            "vtt": ".vtt",
+            "json": ".json"
+        }
+        ext = format_extensions.get(output_format, ".txt")
     
-    extension = format_extensions.get(output_format, ".txt")
-    return str(input_path.parent / f"{base_name}_transcription{extension}")
+    return str(input_path.with_name(f"{input_path.stem}_transcription{ext}"))
+
+def save_transcription(transcriber, input_path, result, args):
+    """格式化并保存单个文件的转录结果，返回退出码"""
+    # 格式化输出
+    formatted_output = transcriber.format_transcription_output(result, args.format)
+    
+    # 确定输出路径
+    if args.output:
+        output_path = args.output
+    else:
+        output_path = generate_output_path(input_path, args.format)
+    
+    # 保存结果
+    try:
+        output_dir = os.path.dirname(output_path)
+        if output_dir:  # 只有当输出路径包含目录时才创建
+            os.makedirs(output_dir, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(formatted_output)
+        
+        print(f"✅ 转录完成！")
+        print(f"📄 输出文件: {output_path}")
+        
+        if args.verbose:
+            print(f"   语言: {result.get('language', '未知')}")
+            print(f"   文本长度: {len(result['text'])}字符")
+            if 'segments' in result:
+                print(f"   分段数: {len(result['segments'])}")
+        
+        # 显示部分转录内容
+        preview_text = result['text'][:200]
+        if len(result['text']) > 200:
+            preview_text += "..."
+        print(f"\n📝 转录预览:\n{preview_text}")
+        
+    except Exception as e:
+        print(f"❌ 保存输出文件失败: {str(e)}")
+        return 1
+    
+    return 0
 
 def main():
     """主函数"""
@@ -150,123 +207,121 @@ def main():
     
     print_banner()
     
-    # 验证输入文件
-    if args.verbose:
-        print(f"验证输入文件: {args.input}")
-    
-    video_validation = validate_video_file(args.input)
-    if not video_validation["valid"]:
-        print(f"❌ 输入文件验证失败: {video_validation['error']}")
+    if args.output and len(args.input) > 1:
+        print("❌ 批量转录多个文件时不能指定 -o/--output")
         return 1
     
-    if args.verbose:
-        print("✅ 视频文件验证通过")
-        print(f"   时长: {video_validation['duration']:.2f}秒")
-        print(f"   分辨率: {video_validation['size']}")
-        print(f"   帧率: {video_validation['fps']:.2f}fps")
-    
-    # 提取音频
-    temp_audio_path = None
-    try:
-        print("🎵 正在从视频中提取音频...")
-        temp_audio_path = extract_audio_from_video(args.input)
+    # 验证输入文件
+    for input_path in args.input:
+        if args.verbose:
+            print(f"验证输入文件: {input_path}")
         
-        # 验证音频文件
-        audio_validation = validate_audio_file(temp_audio_path)
-        if not audio_validation["valid"]:
-            print(f"❌ 音频提取失败: {audio_validation['error']}")
+        video_validation = validate_video_file(input_path)
+        if not video_validation["valid"]:
+            print(f"❌ 输入文件验证失败: {input_path}: {video_validation['error']}")
             return 1
         
         if args.verbose:
-            print("✅ 音频提取完成")
-            print(f"   时长: {audio_validation['duration']:.2f}秒")
-            print(f"   采样率: {audio_validation['sample_rate']}Hz")
-            print(f"   声道数: {audio_validation['channels']}")
-        
-        # 初始化ASR转录器
+            print("✅ 视频文件验证通过")
+            print(f"   时长: {video_validation['duration']:.2f}秒")
+            print(f"   分辨率: {video_validation['size']}")
+            print(f"   帧率: {video_validation['fps']:.2f}fps")
+    
+    # 在后台线程中提取音频（与args.input一一对应），与模型加载并行进行
+    print("🎵 正在从视频中提取音频...")
+    executor = ThreadPoolExecutor(max_workers=2)
+    extract_futures = [executor.submit(extract_audio_from_video, input_path) for input_path in args.input]
+    exit_code = 0
+    try:
+        # 初始化ASR转录器（所有文件共用一个模型）
         print("🤖 正在初始化语音识别模型...")
         transcriber = ASRTranscriber(
             model_name=args.model,
             vad_model=args.vad_model,
             device=args.device,
-            enable_vad=not args.vad_off
+            enable_vad=not args.vad_off,
+            compile_model=args.compile,
+            precision=args.precision,
+            verbose=args.verbose
         )
         
-        # 执行转录
-        print("📝 正在进行语音识别转录...")
-        if args.timestamps:
-            result = transcriber.transcribe_with_timestamps(
-                temp_audio_path, 
-                args.language,
-                max_length=args.max_length,
-                batch_size=args.batch_size
-            )
-        else:
-            result = transcriber.transcribe_audio(
-                temp_audio_path, 
-                args.language, 
-                max_length=args.max_length,
-                batch_size=args.batch_size
-            )
-        
-        if not result["success"]:
-            print(f"❌ 转录失败: {result['error']}")
-            return 1
-        
-        # 格式化输出
-        formatted_output = transcriber.format_transcription_output(result, args.format)
-        
-        # 确定输出路径
-        if args.output:
-            output_path = args.output
-        else:
-            output_path = generate_output_path(args.input, args.format)
-        
-        # 保存结果
-        try:
-            output_dir = os.path.dirname(output_path)
-            if output_dir:  # 只有当输出路径包含目录时才创建
-                os.makedirs(output_dir, exist_ok=True)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(formatted_output)
+        # 按顺序等待音频提取完成，单个文件失败时跳过该文件，继续处理其余文件
+        transcribe_inputs = []
+        temp_audio_paths = []
+        for input_path, future in zip(args.input, extract_futures):
+            try:
+                temp_audio_path = future.result()
+            except Exception as e:
+                print(f"❌ {input_path}: {str(e)}")
+                exit_code = 1
+                continue
             
-            print(f"✅ 转录完成！")
-            print(f"📄 输出文件: {output_path}")
+            # 验证音频文件
+            audio_validation = validate_audio_file(temp_audio_path)
+            if not audio_validation["valid"]:
+                print(f"❌ 音频提取失败: {input_path}: {audio_validation['error']}")
+                exit_code = 1
+                continue
             
             if args.verbose:
-                print(f"   语言: {result.get('language', '未知')}")
-                print(f"   文本长度: {len(result['text'])}字符")
-                if 'segments' in result:
-                    print(f"   分段数: {len(result['segments'])}")
-            
-            # 显示部分转录内容
-            preview_text = result['text'][:200]
-            if len(result['text']) > 200:
-                preview_text += "..."
-            print(f"\n📝 转录预览:\n{preview_text}")
+                print(f"✅ 音频提取完成: {input_path}")
+                print(f"   时长: {audio_validation['duration']:.2f}秒")
+                print(f"   采样率: {audio_validation['sample_rate']}Hz")
+                print(f"   声道数: {audio_validation['channels']}")
             
-        except Exception as e:
-            print(f"❌ 保存输出文件失败: {str(e)}")
+            transcribe_inputs.append(input_path)
+            temp_audio_paths.append(temp_audio_path)
+        
+        if not temp_audio_paths:
             return 1
+        
+        # 执行转录，所有文件共用同一个已加载的模型
+        print("📝 正在进行语音识别转录...")
+        results = transcriber.transcribe_many(
+            temp_audio_paths,
+            args.language,
+            max_length=args.max_length,
+            batch_size=args.batch_size,
+            with_timestamps=args.timestamps
+        )
+        
+        for input_path, result in zip(transcribe_inputs, results):
+            if not result["success"]:
+                print(f"❌ 转录失败: {input_path}: {result['error']}")
+                exit_code = 1
+                continue
+            
+            if save_transcription(transcriber, input_path, result, args) != 0:
+                exit_code = 1
             
     except Exception as e:
         print(f"❌ 处理过程中发生错误: {str(e)}")
         return 1
         
     finally:
+        # 取消未开始的提取任务并等待进行中的任务结束，确保所有临时文件都能被清理
+        for future in extract_futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+        
         # 清理临时文件
-        if temp_audio_path and os.path.exists(temp_audio_path):
-            if args.keep_audio:
-                audio_output_path = generate_output_path(args.input, "wav").replace(".txt", ".wav")
-                os.rename(temp_audio_path, audio_output_path)
-                if args.verbose:
-                    print(f"🎵 音频文件已保存: {audio_output_path}")
-            else:
-                os.unlink(temp_audio_path)
-                if args.verbose:
-                    print("🗑️  临时音频文件已清理")
+        for input_path, future in zip(args.input, extract_futures):
+            if future.cancelled() or future.exception() is not None:
+                continue
+            temp_audio_path = future.result()
+            if temp_audio_path and Path(temp_audio_path).is_file():
+                if args.keep_audio:
+                    audio_output_path = generate_output_path(input_path, ext=".wav")
+                    # 临时目录可能与输出目录不在同一文件系统，不能使用os.rename
+                    shutil.move(temp_audio_path, audio_output_path)
+                    if args.verbose:
+                        print(f"🎵 音频文件已保存: {audio_output_path}")
+                else:
+                    os.unlink(temp_audio_path)
+                    if args.verbose:
+                        print("🗑️  临时音频文件已清理")
     
-    return 0
+    return exit_code
 
 if __name__ == "__main__":
     try:
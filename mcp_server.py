@@ -6,10 +6,13 @@ ASR MCP服务器 V2 - 优化版本
 """
 
 import os
-import json
 import sys
-from pathlib import Path
-from typing import Dict, Any
+import shutil
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple
 
 from fastmcp import FastMCP
 
@@ -21,13 +24,93 @@ from video_processor import extract_audio_from_video, get_supported_video_format
 # 创建FastMCP应用
 mcp = FastMCP("ASR Transcriber")
 
+# 支持直接转录的音频格式和支持提取音频的视频格式
+_AUDIO_EXTS = frozenset({'.wav', '.mp3', '.flac', '.m4a', '.aac'})
+_VIDEO_EXTS = get_supported_video_formats()
+
 # 全局变量
 video_downloader = None
 asr_transcriber = None
+asr_batcher = None
+
+class TranscriptionBatcher:
+    """
+    转录请求微批处理器
+    将短时间内到达的多个转录请求合并为一次transcribe_many调用，
+    由单个后台线程独占模型，天然串行化对模型的访问。
+    启用VAD时FunASR逐个处理输入，合并不共享推理，只会让短音频等待同批的长音频，
+    因此逐个处理请求，每个Future在对应文件完成后立即返回
+    """
+    
+    def __init__(self, transcriber: ASRTranscriber, max_batch_size: int = 4, max_wait_s: float = 0.05):
+        """
+        初始化微批处理器
+        
+        Args:
+            transcriber: 共享的ASR转录器
+            max_batch_size: 单批最多合并的请求数，避免显存不足
+            max_wait_s: 收到第一个请求后等待更多请求的时间窗口(秒)
+        """
+        self.transcriber = transcriber
+        self.max_batch_size = 1 if transcriber.enable_vad else max_batch_size
+        self.max_wait_s = max_wait_s
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="asr-batcher", daemon=True)
+        self._worker.start()
+    
+    def submit(self, audio_path: str, language: str = "auto", max_length: int = 5, batch_size: int = 600) -> Future:
+        """
+        提交转录请求
+        
+        Returns:
+            Future: 结果为transcribe_audio格式的转录结果字典
+        """
+        future = Future()
+        self._queue.put((audio_path, (language, max_length, batch_size), future))
+        return future
+    
+    def _run(self):
+        """后台线程：按时间窗口收集请求并批量转录"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_s
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            # 只有转录参数相同的请求才能合并到同一次推理
+            groups: Dict[Tuple, List] = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            
+            for (language, max_length, batch_size), items in groups.items():
+                self._process(items, language, max_length, batch_size)
+    
+    def _process(self, items: List, language: str, max_length: int, batch_size: int):
+        """批量转录一组请求，并把结果分发给各自的Future（单个文件失败只体现在对应的结果中）"""
+        try:
+            results = self.transcriber.transcribe_many(
+                [audio_path for audio_path, _, _ in items],
+                language=language,
+                max_length=max_length,
+                batch_size=batch_size
+            )
+        except Exception as e:
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+        
+        for (_, _, future), result in zip(items, results):
+            future.set_result(result)
 
 def initialize_services():
     """初始化服务"""
-    global video_downloader, asr_transcriber
+    global video_downloader, asr_transcriber, asr_batcher
     
     try:
         # 初始化视频下载器
@@ -36,12 +119,34 @@ def initialize_services():
         
         # 初始化ASR转录器（默认配置）
         asr_transcriber = ASRTranscriber()
+        asr_batcher = TranscriptionBatcher(asr_transcriber)
         print("✅ ASR转录器初始化成功", file=sys.stderr)
         
     except Exception as e:
         print(f"❌ 服务初始化失败: {str(e)}", file=sys.stderr)
         raise
 
+def _create_output_dir(dir_name: str) -> str:
+    """
+    在transcriptions目录下创建输出目录，重名时追加序号，避免同一秒内的同名任务写入同一目录
+    
+    Args:
+        dir_name: 期望的目录名
+    
+    Returns:
+        实际创建的输出目录路径
+    """
+    base_dir = os.path.join(os.getcwd(), "transcriptions", dir_name)
+    output_dir = base_dir
+    suffix = 1
+    while True:
+        try:
+            os.makedirs(output_dir)
+            return output_dir
+        except FileExistsError:
+            suffix += 1
+            output_dir = f"{base_dir}_{suffix}"
+
 @mcp.tool()
 def transcribe_from_url(
     url: str,
@@ -60,13 +165,9 @@ def transcribe_from_url(
         转录结果
     """
     try:
-        global video_downloader, asr_transcriber
-        
-        # 验证URL
-        if not video_downloader.is_supported_url(url):
-            return f"❌ 不支持的URL或URL无效: {url}"
+        global video_downloader, asr_batcher
         
-        # 获取视频信息
+        # 获取视频信息（URL无效或不受支持时会直接失败，无需单独预检）
         try:
             video_info = video_downloader.get_video_info(url)
             print(f"📹 视频信息: {video_info['title']} (时长: {video_info['duration']}秒)", file=sys.stderr)
@@ -77,38 +178,40 @@ def transcribe_from_url(
         import datetime
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         safe_title = video_downloader._sanitize_filename(video_info['title'])[:50]  # 限制长度
-        output_dir = os.path.join(os.getcwd(), "transcriptions", f"{timestamp}_{safe_title}")
-        os.makedirs(output_dir, exist_ok=True)
+        output_dir = _create_output_dir(f"{timestamp}_{safe_title}")
         
         video_file_path = None
+        video_future = None
         audio_file_path = None
         transcript_file_path = None
         
+        # 视频文件只用于保存，在后台下载，与音频下载和转录并行
+        video_executor = ThreadPoolExecutor(max_workers=1)
+        
         try:
-            # 1. 下载视频文件
+            # 1. 后台下载视频文件
             print("🔽 开始下载视频...", file=sys.stderr)
-            video_file_path = video_downloader.download_video(url, output_dir)
+            video_future = video_executor.submit(
+                video_downloader.download_video, url, output_dir, info=video_info
+            )
             
             # 2. 下载音频文件（用于转录）
             print("🔽 开始下载音频...", file=sys.stderr)
-            audio_file_path = video_downloader.download_audio_only(url, output_dir)
-            
-            # 3. 重新初始化ASR转录器（使用默认VAD设置）
-            transcriber = ASRTranscriber(enable_vad=True)
+            audio_file_path = video_downloader.download_audio_only(url, output_dir, info=video_info)
             
-            # 4. 转录音频
+            # 3. 转录音频（经微批处理器与并发请求合并推理）
             print("🎤 开始转录...", file=sys.stderr)
-            result = transcriber.transcribe_audio(
-                audio_path=audio_file_path,
+            result = asr_batcher.submit(
+                audio_file_path,
                 language=language,
                 max_length=5,  # 默认5秒分段
                 batch_size=600  # 默认批处理大小
-            )
+            ).result()
             
-            # 5. 格式化输出并保存到文件
+            # 4. 格式化输出并保存到文件
             output_content = format_transcription_output(result, output_format, video_info)
             
-            # 6. 保存转录文件
+            # 5. 保存转录文件
             if output_format == "srt":
                 transcript_file_path = os.path.join(output_dir, f"{safe_title}.srt")
             elif output_format == "vtt":
@@ -121,7 +224,14 @@ def transcribe_from_url(
             with open(transcript_file_path, 'w', encoding='utf-8') as f:
                 f.write(output_content)
             
-            # 7. 构建返回结果
+            # 等待后台视频下载完成；视频只用于保存，下载失败不影响已完成的转录
+            try:
+                video_file_path = video_future.result()
+                video_line = f"• 📹 视频文件: {video_file_path}"
+            except Exception as e:
+                video_line = f"• ⚠️ 视频文件下载失败: {str(e)}"
+            
+            # 6. 构建返回结果
             result_info = f"""✅ 转录完成！
 
 📹 **视频信息**:
@@ -130,7 +240,7 @@ def transcribe_from_url(
 • 格式: {output_format}
 
 📁 **文件保存位置**:
-• 📹 视频文件: {video_file_path}
+{video_line}
 • 🎵 音频文件: {audio_file_path}
 • 📝 转录文件: {transcript_file_path}
 • 📂 输出目录: {output_dir}
@@ -141,6 +251,13 @@ def transcribe_from_url(
             return result_info
             
         except Exception as inner_e:
+            # 取消尚未开始的视频下载，或等待进行中的下载结束，避免工具返回后仍向输出目录写入
+            if video_future is not None and not video_future.cancel():
+                try:
+                    video_file_path = video_future.result()
+                except Exception:
+                    pass
+            
             # 如果过程中出错，也返回已保存的文件信息
             error_info = f"⚠️ 转录过程中出现错误: {str(inner_e)}\n\n"
             if video_file_path and os.path.exists(video_file_path):
@@ -150,10 +267,104 @@ def transcribe_from_url(
             if transcript_file_path and os.path.exists(transcript_file_path):
                 error_info += f"📝 已保存转录文件: {transcript_file_path}\n"
             return error_info
+        
+        finally:
+            video_executor.shutdown(wait=True)
                 
     except Exception as e:
         return f"❌ 转录失败: {str(e)}"
 
+def _download_and_submit(url: str, language: str) -> Dict[str, Any]:
+    """
+    获取视频信息并下载音频，然后提交到微批处理器转录（供批量转录在线程池中调用）
+    
+    Args:
+        url: 视频URL
+        language: 语言代码
+    
+    Returns:
+        包含视频信息、输出目录和转录Future的字典
+    """
+    video_info = video_downloader.get_video_info(url)
+    
+    # 创建持久输出目录
+    import datetime
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_title = video_downloader._sanitize_filename(video_info['title'])[:50]  # 限制长度
+    output_dir = _create_output_dir(f"{timestamp}_{safe_title}")
+    
+    audio_file_path = video_downloader.download_audio_only(url, output_dir, info=video_info)
+    
+    # 下载完成立即提交，与其他URL的下载重叠，并与同时完成的请求合并推理
+    future = asr_batcher.submit(
+        audio_file_path,
+        language=language,
+        max_length=5,  # 默认5秒分段
+        batch_size=600  # 默认批处理大小
+    )
+    
+    return {
+        "video_info": video_info,
+        "safe_title": safe_title,
+        "output_dir": output_dir,
+        "audio_file_path": audio_file_path,
+        "future": future
+    }
+
+@mcp.tool()
+def transcribe_from_urls(
+    urls: List[str],
+    output_format: str = "text",
+    language: str = "auto"
+) -> str:
+    """
+    批量从多个视频URL下载音频并转录，下载并行进行
+    
+    Args:
+        urls: 视频URL列表（支持YouTube、Bilibili等平台）
+        output_format: 输出格式（text/srt/vtt/json）
+        language: 语言代码（auto/zh/en/ja/ko等）
+    
+    Returns:
+        每个URL的转录结果摘要
+    """
+    try:
+        global video_downloader, asr_batcher
+        
+        if not urls:
+            return "❌ 未提供任何URL"
+        
+        # 1. 并行获取视频信息并下载音频（网络密集型，线程即可并发）
+        print(f"🔽 开始并行下载 {len(urls)} 个音频...", file=sys.stderr)
+        with ThreadPoolExecutor(max_workers=min(8, len(urls))) as pool:
+            download_futures = [pool.submit(_download_and_submit, url, language) for url in urls]
+        
+        # 2. 按输入顺序等待转录结果并保存
+        summaries = []
+        for i, (url, download_future) in enumerate(zip(urls, download_futures), 1):
+            try:
+                job = download_future.result()
+                result = job["future"].result()
+                
+                output_content = format_transcription_output(result, output_format, job["video_info"])
+                extension = {"srt": ".srt", "vtt": ".vtt", "json": ".json"}.get(output_format, ".txt")
+                transcript_file_path = os.path.join(job["output_dir"], f"{job['safe_title']}{extension}")
+                with open(transcript_file_path, 'w', encoding='utf-8') as f:
+                    f.write(output_content)
+                
+                summaries.append(f"""✅ [{i}] {job['video_info']['title']}
+• 🎵 音频文件: {job['audio_file_path']}
+• 📝 转录文件: {transcript_file_path}
+• 🔍 预览: {output_content[:200]}{"..." if len(output_content) > 200 else ""}""")
+            except Exception as e:
+                summaries.append(f"❌ [{i}] {url}: {str(e)}")
+        
+        succeeded = sum(1 for summary in summaries if summary.startswith("✅"))
+        return f"批量转录完成：{succeeded}/{len(urls)} 成功，格式: {output_format}\n\n" + "\n\n".join(summaries)
+        
+    except Exception as e:
+        return f"❌ 批量转录失败: {str(e)}"
+
 @mcp.tool()
 def transcribe_local_file(
     file_path: str,
@@ -172,62 +383,53 @@ def transcribe_local_file(
         转录结果
     """
     try:
-        global asr_transcriber
-        
-        file_path = Path(file_path)
+        global asr_batcher
         
-        if not file_path.exists():
+        if not os.path.exists(file_path):
             return f"❌ 文件不存在: {file_path}"
         
         # 检查文件类型
-        file_ext = file_path.suffix.lower()
-        audio_exts = ['.wav', '.mp3', '.flac', '.m4a', '.aac']
-        video_exts = get_supported_video_formats()
+        base_name, file_ext = os.path.splitext(os.path.basename(file_path))
+        file_ext = file_ext.lower()
         
         # 创建持久输出目录
         import datetime
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_title = file_path.stem[:50]  # 限制长度
-        output_dir = os.path.join(os.getcwd(), "transcriptions", f"{timestamp}_{safe_title}_local")
-        os.makedirs(output_dir, exist_ok=True)
+        safe_title = base_name[:50]  # 限制长度
+        output_dir = _create_output_dir(f"{timestamp}_{safe_title}_local")
         
         audio_file_path = None
         transcript_file_path = None
         
         try:
-            if file_ext in audio_exts:
+            if file_ext in _AUDIO_EXTS:
                 # 直接处理音频文件，复制到输出目录
-                import shutil
                 audio_file_path = os.path.join(output_dir, f"{safe_title}_audio{file_ext}")
-                shutil.copy2(str(file_path), audio_file_path)
+                shutil.copy2(file_path, audio_file_path)
                 audio_file = audio_file_path
-            elif file_ext in video_exts:
+            elif file_ext in _VIDEO_EXTS:
                 # 复制原视频文件
-                import shutil
                 video_file_path = os.path.join(output_dir, f"{safe_title}_video{file_ext}")
-                shutil.copy2(str(file_path), video_file_path)
+                shutil.copy2(file_path, video_file_path)
                 
                 # 从视频提取音频
                 print("🎬 从视频提取音频...", file=sys.stderr)
                 audio_file_path = os.path.join(output_dir, f"{safe_title}_extracted_audio.wav")
-                audio_file = extract_audio_from_video(str(file_path), audio_file_path)
+                audio_file = extract_audio_from_video(file_path, audio_file_path)
             else:
                 return f"❌ 不支持的文件格式: {file_ext}"
             
-            # 重新初始化ASR转录器（使用默认VAD设置）
-            transcriber = ASRTranscriber(enable_vad=True)
-            
-            # 转录音频
+            # 转录音频（经微批处理器与并发请求合并推理）
             print("🎤 开始转录...", file=sys.stderr)
-            result = transcriber.transcribe_audio(
-                audio_path=audio_file,
+            result = asr_batcher.submit(
+                audio_file,
                 language=language,
                 max_length=5,  # 默认5秒分段
                 batch_size=600  # 默认批处理大小
-            )
+            ).result()
             
             # 格式化输出并保存到文件
-            file_info = {"title": file_path.stem, "duration": 0}
+            file_info = {"title": base_name, "duration": 0}
             output_content = format_transcription_output(result, output_format, file_info)
             
             # 保存转录文件
@@ -248,7 +450,7 @@ def transcribe_local_file(
 
 📁 **文件信息**:
 • 原文件: {file_path}
-• 文件类型: {file_ext} ({'Audio' if file_ext in audio_exts else 'Video'})
+• 文件类型: {file_ext} ({'Audio' if file_ext in _AUDIO_EXTS else 'Video'})
 • 格式: {output_format}
 
 📁 **文件保存位置**:
@@ -332,13 +534,13 @@ def list_supported_languages() -> str:
         "ru": "俄语"
     }
     
-    result = "🌍 **支持的语言**:\n\n"
-    for code, name in languages.items():
-        result += f"• `{code}`: {name}\n"
-    
-    result += "\n**使用方法**: 在转录时设置 `language` 参数，例如 `language='zh'` 表示中文"
+    lines = [f"• `{code}`: {name}\n" for code, name in languages.items()]
     
-    return result
+    return "".join([
+        "🌍 **支持的语言**:\n\n",
+        *lines,
+        "\n**使用方法**: 在转录时设置 `language` 参数，例如 `language='zh'` 表示中文"
+    ])
 
 @mcp.tool()
 def list_supported_platforms() -> str:
@@ -352,14 +554,14 @@ def list_supported_platforms() -> str:
         global video_downloader
         sites = video_downloader.get_supported_sites()
         
-        result = "🌐 **支持的主要视频平台**:\n\n"
-        for site in sites[:15]:  # 显示前15个
-            result += f"• {site}\n"
+        lines = [f"• {site}\n" for site in sites[:15]]  # 显示前15个
         
-        result += f"\n还支持更多平台... (共支持 {len(sites)}+ 个平台)"
-        result += "\n\n**使用方法**: 直接提供视频URL即可，系统会自动识别平台"
-        
-        return result
+        return "".join([
+            "🌐 **支持的主要视频平台**:\n\n",
+            *lines,
+            f"\n还支持更多平台... (共支持 {len(sites)}+ 个平台)",
+            "\n\n**使用方法**: 直接提供视频URL即可，系统会自动识别平台"
+        ])
         
     except Exception as e:
         return f"❌ 获取支持平台列表失败: {str(e)}"
@@ -379,13 +581,13 @@ def get_output_formats() -> str:
         "json": "JSON结构化格式，包含详细的时间戳和元数据"
     }
     
-    result = "📄 **支持的输出格式**:\n\n"
-    for format_type, description in formats.items():
-        result += f"• **{format_type}**: {description}\n"
-    
-    result += "\n**使用方法**: 在转录时设置 `output_format` 参数，例如 `output_format='srt'`"
+    lines = [f"• **{format_type}**: {description}\n" for format_type, description in formats.items()]
     
-    return result
+    return "".join([
+        "📄 **支持的输出格式**:\n\n",
+        *lines,
+        "\n**使用方法**: 在转录时设置 `output_format` 参数，例如 `output_format='srt'`"
+    ])
 
 def format_transcription_output(result: Dict[str, Any], output_format: str, video_info: Dict[str, Any]) -> str:
     """
@@ -404,6 +606,7 @@ def format_transcription_output(result: Dict[str, Any], output_format: str, vide
             return result.get("text", "")
         
         elif output_format == "json":
+            import json
             return json.dumps({
                 "video_info": video_info,
                 "transcription": result
@@ -411,29 +614,23 @@ def format_transcription_output(result: Dict[str, Any], output_format: str, vide
         
         elif output_format == "srt":
             segments = result.get("segments", [])
-            srt_content = ""
+            _fmt = format_srt_time
             
-            for i, segment in enumerate(segments, 1):
-                start_time = format_srt_time(segment["start"])
-                end_time = format_srt_time(segment["end"])
-                text = segment["text"].strip()
-                
-                srt_content += f"{i}\n{start_time} --> {end_time}\n{text}\n\n"
-            
-            return srt_content
+            return "".join([
+                f"{i}\n{_fmt(segment['start'])} --> {_fmt(segment['end'])}\n"
+                f"{segment['text'].strip()}\n\n"
+                for i, segment in enumerate(segments, 1)
+            ])
         
         elif output_format == "vtt":
             segments = result.get("segments", [])
-            vtt_content = "WEBVTT\n\n"
+            _fmt = format_vtt_time
             
-            for segment in segments:
-                start_time = format_vtt_time(segment["start"])
-                end_time = format_vtt_time(segment["end"])
-                text = segment["text"].strip()
-                
-                vtt_content += f"{start_time} --> {end_time}\n{text}\n\n"
-            
-            return vtt_content
+            return "WEBVTT\n\n" + "".join([
+                f"{_fmt(segment['start'])} --> {_fmt(segment['end'])}\n"
+                f"{segment['text'].strip()}\n\n"
+                for segment in segments
+            ])
         
         else:
             return f"不支持的输出格式: {output_format}"
@@ -441,19 +638,23 @@ def format_transcription_output(result: Dict[str, Any], output_format: str, vide
     except Exception as e:
         return f"格式化输出失败: {str(e)}"
 
+def _split_hms_ms(seconds: float) -> tuple:
+    """将秒数按整数毫秒拆分为(时, 分, 秒, 毫秒)"""
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return h, m, s, ms
+
 def format_srt_time(seconds: float) -> str:
     """格式化SRT时间格式"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = seconds % 60
-    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}".replace('.', ',')
+    h, m, s, ms = _split_hms_ms(seconds)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
 
 def format_vtt_time(seconds: float) -> str:
     """格式化VTT时间格式"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = seconds % 60
-    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
+    h, m, s, ms = _split_hms_ms(seconds)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
 
 def main():
     """主函数"""
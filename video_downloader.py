@@ -1,44 +1,81 @@
 import os
+import sys
 import tempfile
-import subprocess
-import json
-import re
+import functools
+import threading
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 from urllib.parse import urlparse
 
+import yt_dlp
+from yt_dlp import YoutubeDL
+from yt_dlp.extractor import gen_extractor_classes
+
+# 已知支持的主要视频网站域名，命中时无需调用yt-dlp验证
+_KNOWN_HOSTS = (
+    "youtube.com", "youtu.be", "bilibili.com", "twitter.com", "x.com",
+    "tiktok.com", "vimeo.com", "dailymotion.com", "instagram.com", "facebook.com"
+)
+_KNOWN_HOST_SUFFIXES = tuple("." + host for host in _KNOWN_HOSTS)
+
+# 文件名非法字符替换表
+_SANITIZE_TABLE = str.maketrans({c: '_' for c in '<>:"/\\|?*'})
+
+@functools.lru_cache(maxsize=1)
+def _supported_sites() -> tuple:
+    """
+    获取主要视频网站的提取器名称（进程内只计算一次）
+    
+    Returns:
+        tuple: 主要网站提取器名称
+    """
+    extractors = [ie.IE_NAME for ie in gen_extractor_classes()]
+    # 过滤出主要的网站
+    major_sites = [
+        site for site in extractors 
+        if any(keyword in site.lower() for keyword in [
+            'youtube', 'bilibili', 'twitter', 'tiktok', 
+            'instagram', 'facebook', 'vimeo', 'dailymotion'
+        ])
+    ]
+    return tuple(major_sites[:20])  # 返回前20个主要网站
+
 class VideoDownloader:
     """
     基于yt-dlp的视频下载器
     支持YouTube、Bilibili等多个视频平台
     """
     
-    def __init__(self, yt_dlp_path: str = "yt-dlp"):
+    # yt-dlp可用性只需在进程内检查一次
+    _checked = False
+    
+    def __init__(self):
         """
-        初始化视频下载器
-        
-        Args:
-            yt_dlp_path (str): yt-dlp可执行文件路径，默认使用系统PATH中的yt-dlp
+        初始化视频下载器，进程内直接调用yt-dlp Python API
         """
-        self.yt_dlp_path = yt_dlp_path
         self._check_yt_dlp()
+        # YoutubeDL实例不是线程安全的，每个线程复用各自的实例获取视频信息，保持提取器缓存
+        self._local = threading.local()
+    
+    @property
+    def _ydl(self) -> YoutubeDL:
+        """当前线程用于获取视频信息的YoutubeDL实例"""
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            ydl = self._local.ydl = YoutubeDL({
+                "quiet": True,
+                "no_warnings": True,
+                "skip_download": True,
+                "socket_timeout": 30
+            })
+        return ydl
     
     def _check_yt_dlp(self):
         """检查yt-dlp是否可用"""
-        try:
-            result = subprocess.run(
-                [self.yt_dlp_path, "--version"], 
-                capture_output=True, 
-                text=True, 
-                timeout=10
-            )
-            if result.returncode != 0:
-                raise Exception(f"yt-dlp不可用: {result.stderr}")
-            print(f"✅ yt-dlp版本: {result.stdout.strip()}")
-        except FileNotFoundError:
-            raise Exception(f"找不到yt-dlp，请确保已安装并在PATH中: {self.yt_dlp_path}")
-        except subprocess.TimeoutExpired:
-            raise Exception("yt-dlp响应超时")
+        if VideoDownloader._checked:
+            return
+        print(f"✅ yt-dlp版本: {yt_dlp.version.__version__}", file=sys.stderr)
+        VideoDownloader._checked = True
     
     def get_video_info(self, url: str) -> Dict[str, Any]:
         """
@@ -51,26 +88,14 @@ class VideoDownloader:
             Dict[str, Any]: 视频信息
         """
         try:
-            cmd = [
-                self.yt_dlp_path,
-                "--no-download",
-                "--dump-json",
-                "--no-warnings",
-                url
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            info = self._ydl.extract_info(url, download=False)
+            if not info:
+                raise Exception("未获取到视频信息")
             
-            if result.returncode != 0:
-                raise Exception(f"获取视频信息失败: {result.stderr}")
-            
-            # 解析JSON信息
-            info = json.loads(result.stdout.strip())
+            # 描述只截断超长部分，避免重复查找和无谓的字符串拼接
+            description = info.get("description") or ""
+            if len(description) > 500:
+                description = description[:500] + "..."
             
             return {
                 "id": info.get("id", ""),
@@ -79,16 +104,12 @@ class VideoDownloader:
                 "uploader": info.get("uploader", "Unknown Uploader"),
                 "upload_date": info.get("upload_date", ""),
                 "view_count": info.get("view_count", 0),
-                "description": info.get("description", "")[:500] + "..." if info.get("description", "") else "",
+                "description": description,
                 "formats_available": len(info.get("formats", [])),
                 "ext": info.get("ext", "mp4"),
                 "webpage_url": info.get("webpage_url", url)
             }
             
-        except json.JSONDecodeError as e:
-            raise Exception(f"解析视频信息JSON失败: {str(e)}")
-        except subprocess.TimeoutExpired:
-            raise Exception("获取视频信息超时")
         except Exception as e:
             raise Exception(f"获取视频信息失败: {str(e)}")
     
@@ -97,7 +118,8 @@ class VideoDownloader:
         url: str, 
         output_dir: Optional[str] = None,
         format_selector: str = "best[height<=720]",
-        audio_only: bool = False
+        audio_only: bool = False,
+        info: Optional[Dict[str, Any]] = None
     ) -> str:
         """
         下载视频
@@ -107,6 +129,8 @@ class VideoDownloader:
             output_dir (str, optional): 输出目录，默认使用临时目录
             format_selector (str): 格式选择器，默认选择720p以下最佳质量
             audio_only (bool): 是否只下载音频
+            info (Dict[str, Any], optional): 已获取的视频信息（get_video_info的返回值），
+                提供时用其标题命名文件；否则由yt-dlp按标题生成文件名，不再额外获取视频信息
             
         Returns:
             str: 下载的文件路径
@@ -118,79 +142,103 @@ class VideoDownloader:
         output_dir.mkdir(parents=True, exist_ok=True)
         
         try:
-            # 获取视频信息用于生成文件名
-            info = self.get_video_info(url)
-            safe_title = self._sanitize_filename(info["title"])
+            # 文件名：优先使用已知标题，否则交给yt-dlp按标题生成（yt-dlp会自行清理非法字符）
+            if info is not None:
+                file_stem = self._sanitize_filename(info["title"])
+            else:
+                file_stem = "%(title).200B"
             
-            # 构建输出模板
+            # 构建输出模板（音频使用独立文件名，避免与同目录下载的视频文件冲突）
             if audio_only:
-                output_template = str(output_dir / f"{safe_title}.%(ext)s")
+                file_stem = f"{file_stem}_audio"
                 format_selector = "bestaudio/best"
-            else:
-                output_template = str(output_dir / f"{safe_title}.%(ext)s")
+            output_template = str(output_dir / f"{file_stem}.%(ext)s")
             
-            if audio_only:
-                cmd = [
-                    self.yt_dlp_path,
-                    "-o", output_template,
-                    "--no-warnings",
-                    url
-                ]
-            else:
-                cmd = [
-                    self.yt_dlp_path,
-                    "-o", output_template,
-                    "--no-warnings",
-                    url
-                ]
+            ydl_opts = {
+                "outtmpl": output_template,
+                "quiet": True,
+                "no_warnings": True,
+                "concurrent_fragment_downloads": 4,  # 并行下载HLS/DASH分片
+                "noprogress": True,
+                "progress_hooks": [self._make_progress_hook('音频' if audio_only else '视频')]
+            }
             
-            # 如果只要音频，添加音频转换参数
+            # 如果只要音频，添加音频转换参数：在同一次后处理中直接转换为ASR所需的16kHz单声道WAV
             if audio_only:
-                cmd.extend([
-                    "--extract-audio",
-                    "--audio-format", "wav",
-                    "--audio-quality", "0"
-                ])
+                ydl_opts.update({
+                    "format": format_selector,
+                    "postprocessors": [{
+                        "key": "FFmpegExtractAudio",
+                        "preferredcodec": "wav",
+                        "preferredquality": "0"
+                    }],
+                    "postprocessor_args": {
+                        "extractaudio": ["-ac", "1", "-ar", "16000", "-acodec", "pcm_s16le"]
+                    },
+                    "nopart": True
+                })
             
-            print(f"正在下载{'音频' if audio_only else '视频'}: {info['title']}")
+            print(f"正在下载{'音频' if audio_only else '视频'}: {info['title'] if info else url}", file=sys.stderr)
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=1800  # 30分钟超时
-            )
+            with YoutubeDL(ydl_opts) as ydl:
+                downloaded_info = ydl.extract_info(url, download=True)
             
-            if result.returncode != 0:
-                raise Exception(f"下载失败: {result.stderr}")
-            
-            # 查找下载的文件
-            downloaded_files = list(output_dir.glob(f"{safe_title}.*"))
-            if not downloaded_files:
+            # 查找下载的文件（后处理完成后的最终路径）
+            downloaded_file = next(
+                (download["filepath"] for download in (downloaded_info or {}).get("requested_downloads", [])
+                 if download.get("filepath") and os.path.exists(download["filepath"])),
+                None
+            )
+            if downloaded_file is None:
                 raise Exception("未找到下载的文件")
             
-            downloaded_file = str(downloaded_files[0])
-            print(f"✅ 下载完成: {downloaded_file}")
+            print(f"✅ 下载完成: {downloaded_file}", file=sys.stderr)
             
             return downloaded_file
             
-        except subprocess.TimeoutExpired:
-            raise Exception("下载超时（30分钟）")
         except Exception as e:
             raise Exception(f"下载失败: {str(e)}")
     
-    def download_audio_only(self, url: str, output_dir: Optional[str] = None) -> str:
+    def _make_progress_hook(self, label: str):
+        """
+        创建yt-dlp进度回调，按10%粒度将下载进度输出到stderr，不缓存任何日志
+        
+        Args:
+            label (str): 进度输出中显示的下载类型
+            
+        Returns:
+            Callable: yt-dlp progress hook
+        """
+        last_reported: Dict[str, int] = {}
+        
+        def hook(status: Dict[str, Any]):
+            if status.get("status") != "downloading":
+                return
+            total = status.get("total_bytes") or status.get("total_bytes_estimate")
+            if not total:
+                return
+            percent = int(status.get("downloaded_bytes", 0) * 100 / total) // 10 * 10
+            filename = status.get("filename", "")
+            if percent > last_reported.get(filename, -1):
+                last_reported[filename] = percent
+                print(f"   {label}下载进度: {percent}%", file=sys.stderr)
+        
+        return hook
+    
+    def download_audio_only(self, url: str, output_dir: Optional[str] = None,
+                            info: Optional[Dict[str, Any]] = None) -> str:
         """
         只下载音频
         
         Args:
             url (str): 视频URL
             output_dir (str, optional): 输出目录
+            info (Dict[str, Any], optional): 已获取的视频信息
             
         Returns:
             str: 下载的音频文件路径
         """
-        return self.download_video(url, output_dir, audio_only=True)
+        return self.download_video(url, output_dir, audio_only=True, info=info)
     
     def _sanitize_filename(self, filename: str) -> str:
         """
@@ -203,7 +251,7 @@ class VideoDownloader:
             str: 清理后的文件名
         """
         # 移除或替换非法字符
-        filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+        filename = filename.translate(_SANITIZE_TABLE)
         # 限制长度
         if len(filename) > 200:
             filename = filename[:200]
@@ -223,26 +271,7 @@ class VideoDownloader:
             List[str]: 支持的网站列表
         """
         try:
-            result = subprocess.run(
-                [self.yt_dlp_path, "--list-extractors"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            if result.returncode == 0:
-                extractors = result.stdout.strip().split('\n')
-                # 过滤出主要的网站
-                major_sites = [
-                    site for site in extractors 
-                    if any(keyword in site.lower() for keyword in [
-                        'youtube', 'bilibili', 'twitter', 'tiktok', 
-                        'instagram', 'facebook', 'vimeo', 'dailymotion'
-                    ])
-                ]
-                return major_sites[:20]  # 返回前20个主要网站
-            else:
-                return ["YouTube", "Bilibili", "Twitter", "TikTok"]  # 默认列表
+            return list(_supported_sites())
                 
         except Exception:
             return ["YouTube", "Bilibili", "Twitter", "TikTok"]  # 默认列表
@@ -263,9 +292,19 @@ class VideoDownloader:
             if not parsed.scheme or not parsed.netloc:
                 return False
             
-            # 尝试获取视频信息来验证支持性
-            info = self.get_video_info(url)
-            return bool(info.get("title"))
+            # 已知域名（含子域名，如www.youtube.com）直接放行
+            host = (parsed.hostname or "").lower()
+            if host in _KNOWN_HOSTS or host.endswith(_KNOWN_HOST_SUFFIXES):
+                return True
+            
+            # 优先用专用提取器的URL规则判断，无需联网
+            for ie in gen_extractor_classes():
+                if ie.ie_key() != "Generic" and ie.suitable(url):
+                    return True
+            
+            # 只有通用提取器能处理时，解析页面（不处理格式）来验证支持性
+            info = self._ydl.extract_info(url, download=False, process=False)
+            return bool(info and info.get("title"))
             
         except Exception:
             return False
\ No newline at end of file
@@ -1,7 +1,11 @@
 import os
+import json
+import functools
 import tempfile
-from moviepy import VideoFileClip
-import soundfile as sf
+import subprocess
+
+# 支持的视频格式扩展名
+_SUPPORTED_VIDEO_EXTS = frozenset({'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v'})
 
 def extract_audio_from_video(video_path, output_audio_path=None):
     """
@@ -17,30 +21,98 @@ def extract_audio_from_video(video_path, output_audio_path=None):
     if not os.path.exists(video_path):
         raise FileNotFoundError(f"视频文件不存在: {video_path}")
     
+    # 预检查音频流（复用validate_video_file已缓存的ffprobe结果）
+    try:
+        streams = _ffprobe(video_path).get("streams", [])
+    except Exception as e:
+        raise Exception(f"提取音频失败: 无法读取视频文件: {str(e)}")
+    if not any(stream.get("codec_type") == "audio" for stream in streams):
+        raise Exception("提取音频失败: 文件中没有音频流")
+    
     if output_audio_path is None:
         # 创建临时音频文件
         with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
             output_audio_path = tmp_file.name
     
     try:
-        # 加载视频文件
-        video = VideoFileClip(video_path)
-        
-        # 提取音频
-        audio = video.audio
-        
-        # 保存音频文件
-        audio.write_audiofile(output_audio_path, logger=None)
-        
-        # 关闭资源
-        audio.close()
-        video.close()
+        # 直接用ffmpeg提取为16kHz单声道PCM WAV（ASR所需格式），跳过视频帧解码
+        cmd = [
+            "ffmpeg", "-nostdin",
+            "-i", video_path,
+            "-vn",
+            "-ac", "1",
+            "-ar", "16000",
+            "-acodec", "pcm_s16le",
+            output_audio_path,
+            "-y",
+            "-loglevel", "error"
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(result.stderr.strip() or f"ffmpeg退出码 {result.returncode}")
         
         return output_audio_path
         
     except Exception as e:
         raise Exception(f"提取音频失败: {str(e)}")
 
+@functools.lru_cache(maxsize=64)
+def _ffprobe_cached(path, mtime, size):
+    """按(路径, 修改时间, 文件大小)缓存ffprobe结果，文件变化后自动失效"""
+    output = subprocess.check_output(
+        ["ffprobe", "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        stderr=subprocess.PIPE
+    )
+    return json.loads(output)
+
+def _ffprobe(path):
+    """
+    使用ffprobe读取媒体文件的流和容器信息，同一文件只探测一次
+    
+    Args:
+        path (str): 媒体文件路径
+    
+    Returns:
+        dict: ffprobe输出的JSON信息（缓存共享，调用方不应修改）
+    """
+    st = os.stat(path)
+    return _ffprobe_cached(os.path.abspath(path), st.st_mtime, st.st_size)
+
+def probe(video_path):
+    """
+    探测视频文件的基本信息
+    
+    Args:
+        video_path (str): 视频文件路径
+    
+    Returns:
+        dict: 包含duration、fps、size、format的视频信息
+    """
+    info = _ffprobe(video_path)
+    video_stream = next(
+        (stream for stream in info.get("streams", []) if stream.get("codec_type") == "video"),
+        None
+    )
+    if video_stream is None:
+        raise Exception("文件中没有视频流")
+    
+    return {
+        "duration": float(info.get("format", {}).get("duration") or video_stream.get("duration") or 0),
+        "fps": _parse_frame_rate(video_stream.get("avg_frame_rate") or video_stream.get("r_frame_rate")),
+        "size": [video_stream.get("width", 0), video_stream.get("height", 0)],
+        "format": os.path.splitext(video_path)[1].lower()
+    }
+
+def _parse_frame_rate(rate):
+    """将ffprobe的帧率字符串（如"30000/1001"）转换为浮点数"""
+    if not rate:
+        return 0.0
+    num, _, den = rate.partition("/")
+    try:
+        return float(num) / float(den) if den else float(num)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
 def validate_audio_file(audio_path):
     """
     验证音频文件是否有效
@@ -52,16 +124,16 @@ def validate_audio_file(audio_path):
         dict: 音频文件信息
     """
     try:
-        data, samplerate = sf.read(audio_path)
-        duration = len(data) / samplerate
-        
-        return {
-            "valid": True,
-            "duration": duration,
-            "sample_rate": samplerate,
-            "channels": data.shape[1] if len(data.shape) > 1 else 1,
-            "samples": len(data)
-        }
+        import soundfile as sf
+        # 只读取文件头信息，不解码音频数据
+        with sf.SoundFile(audio_path) as f:
+            return {
+                "valid": True,
+                "duration": f.frames / f.samplerate,
+                "sample_rate": f.samplerate,
+                "channels": f.channels,
+                "samples": f.frames
+            }
     except Exception as e:
         return {
             "valid": False,
@@ -73,9 +145,9 @@ def get_supported_video_formats():
     获取支持的视频格式列表
     
     Returns:
-        list: 支持的视频格式扩展名
+        frozenset: 支持的视频格式扩展名
     """
-    return ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v']
+    return _SUPPORTED_VIDEO_EXTS
 
 def validate_video_file(video_path):
     """
@@ -91,25 +163,13 @@ def validate_video_file(video_path):
         return {"valid": False, "error": "文件不存在"}
     
     file_ext = os.path.splitext(video_path)[1].lower()
-    if file_ext not in get_supported_video_formats():
+    if file_ext not in _SUPPORTED_VIDEO_EXTS:
         return {
             "valid": False, 
-            "error": f"不支持的视频格式: {file_ext}。支持的格式: {', '.join(get_supported_video_formats())}"
+            "error": f"不支持的视频格式: {file_ext}。支持的格式: {', '.join(sorted(_SUPPORTED_VIDEO_EXTS))}"
         }
     
     try:
-        video = VideoFileClip(video_path)
-        duration = video.duration
-        fps = video.fps
-        size = video.size
-        video.close()
-        
-        return {
-            "valid": True,
-            "duration": duration,
-            "fps": fps,
-            "size": size,
-            "format": file_ext
-        }
+        return {"valid": True, **probe(video_path)}
     except Exception as e:
-        return {"valid": False, "error": f"无法读取视频文件: {str(e)}"}
\ No newline at end of file
+        return {"valid": False, "error": f"无法读取视频文件: {str(e)}"}